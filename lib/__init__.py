@@ -1,6 +1,16 @@
-from .bitunix import BitunixFutures, BitunixError
-from .forward_tester import ForwardTester
-from . import ai, custom_helpers, market_data
+import importlib
+
+from . import custom_helpers
+
+# Everything except custom_helpers is imported on first attribute access, so `import lib`
+# stays stdlib-only until a caller actually touches the exchange or market-data code
+# (which pulls in requests, pandas and NumPy).
+_LAZY_SUBMODULES = {"ai", "market_data"}
+_LAZY_CLASSES = {
+    "BitunixFutures": "bitunix",
+    "BitunixError": "bitunix",
+    "ForwardTester": "forward_tester",
+}
 
 __all__ = [
     "ai",
@@ -10,3 +20,13 @@ __all__ = [
     "BitunixFutures",
     "BitunixError",
 ]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _LAZY_CLASSES:
+        value = getattr(importlib.import_module(f".{_LAZY_CLASSES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,7 @@
 import json
+import hashlib
 import logging
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any, Literal
@@ -21,6 +23,10 @@ MAX_TOKENS = 800
 #   Upper bound of tokens the model may generate in the *response*.
 #   Needs to be high enough so long "reasons" plus JSON do not get cut off mid-output.
 
+CACHE_TTL_SECONDS = 3600
+#   How long an outlook is reused when the exact same prompt is sent again.
+#   Set to 0 to always query the LLM.
+
 
 
 class AIResponseError(Exception):
@@ -98,6 +104,59 @@ def send_request(prompt: str, crypto_symbol: str, api_key: str) -> AIOutlook:
         raise AIResponseError(f"Invalid API response structure: {e}")
 
 
+def send_request_cached(
+        prompt: str,
+        crypto_symbol: str,
+        api_key: str,
+        run_name: str,
+        ttl: float = CACHE_TTL_SECONDS
+) -> tuple[AIOutlook, bool]:
+    """
+    Same as send_request, but reuse the last outlook if the prompt is unchanged.
+
+    The last prompt hash and its outlook are kept in ai_responses/<run_name>_cache.json,
+    so an identical market context within `ttl` seconds skips the LLM round-trip.
+
+    Returns:
+        Tuple of the outlook and whether it came from the cache
+    """
+    cache_file = Path("ai_responses") / f"{run_name}_cache.json"
+    prompt_hash = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+    cached = _load_cached_outlook(cache_file, prompt_hash, ttl)
+    if cached is not None:
+        logging.info("Prompt unchanged since last request, reusing cached AI outlook")
+        return cached, True
+
+    outlook = send_request(prompt, crypto_symbol, api_key)
+    _store_cached_outlook(cache_file, prompt_hash, outlook)
+    return outlook, False
+
+
+def _load_cached_outlook(cache_file: Path, prompt_hash: str, ttl: float) -> AIOutlook | None:
+    if ttl <= 0 or not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry["prompt_hash"] != prompt_hash or time.time() - entry["created_at"] >= ttl:
+            return None
+        return AIOutlook(**entry["outlook"])
+    except (OSError, KeyError, TypeError, json.JSONDecodeError, ValidationError) as e:
+        logging.warning(f"Ignoring unreadable AI cache {cache_file}: {e}")
+        return None
+
+
+def _store_cached_outlook(cache_file: Path, prompt_hash: str, outlook: AIOutlook) -> None:
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        entry = {"prompt_hash": prompt_hash, "created_at": time.time(), "outlook": outlook.model_dump()}
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+    except Exception as e:
+        logging.error(f"Failed to cache AI response: {e}")
+
+
 def _build_tools_schema(crypto_symbol: str) -> list[dict[str, Any]]:
     """
     Build the JSON schema for the LLM tool/function call.
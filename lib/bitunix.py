@@ -134,6 +134,8 @@ class BitunixClient:
 
 
 class BitunixFutures:
+    SUPPORTS_POSITION_TPSL: bool = True
+
     def __init__(self, api_key: str, secret_key: str):
         self._auth = BitunixAuth(api_key, secret_key)
         self._client = BitunixClient(self._auth)
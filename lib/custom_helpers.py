@@ -1,7 +1,34 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Literal, Optional
+from typing import Any, Literal, Optional
+
+
+AI_SIGNAL_CONFIDENCE = 0.6
+#   Weight of the AI vote in combine_signals (the guardrail's vote is at most 1.0).
+
+# market_data.derive_signal reports confidence 0.55 + |score| (capped at 0.95) and only
+# calls a direction once |score| > 0.15, i.e. above 0.70 confidence.
+GUARDRAIL_NEUTRAL_CONFIDENCE = 0.55
+GUARDRAIL_DIRECTION_CONFIDENCE = 0.70
+GUARDRAIL_MAX_CONFIDENCE = 0.95
+
+
+@dataclass(frozen=True, slots=True)
+class FusedSignal:
+    """Outcome of combine_signals: the label to trade and how strongly it is supported."""
+    signal: Literal["Bullish", "Bearish", "Neutral"]
+    confidence: float
+
+
+@dataclass(frozen=True, slots=True)
+class ExchangeSnapshot:
+    """Account state needed to size and open a trade, fetched in one go."""
+    balance: float
+    position: Any | None
+    price: float | None = None
 
 
 def get_timestamp() -> str:
@@ -43,7 +70,57 @@ def calculate_stop_loss_price(entry_price: float, side: str, sl_percent: float)
         return entry_price * (1 + sl_percent / 100)
 
 
-def calculate_position_size(exchange, symbol: str, position_size: str | float | int) -> float:
+def snapshot_for_trade(
+        exchange,
+        symbol: str,
+        margin_coin: str = "USDT",
+        include_price: bool = False
+) -> ExchangeSnapshot:
+    """
+    Fetch balance and pending position (and optionally current price) concurrently.
+
+    The exchange calls are independent, so they are overlapped instead of
+    paying one round-trip after another. The price is only needed to size a new
+    position, so a failed price fetch is logged and left as None rather than
+    raised; runs that end up holding or closing never depend on the ticker.
+
+    Args:
+        exchange: Exchange client (BitunixFutures or ForwardTester)
+        symbol: Trading pair symbol (e.g., "BTCUSDT")
+        margin_coin: Coin the balance is reported in
+        include_price: Also fetch the current price
+
+    Returns:
+        ExchangeSnapshot with balance, position (None if flat) and price (None if not fetched)
+    """
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        balance = pool.submit(exchange.get_account_balance, margin_coin)
+        position = pool.submit(exchange.get_pending_positions, symbol=symbol)
+        price = pool.submit(exchange.get_current_price, symbol) if include_price else None
+        return ExchangeSnapshot(
+            balance=balance.result(),
+            position=position.result(),
+            price=_result_or_none(price, f"current price for {symbol}"),
+        )
+
+
+def _result_or_none(future, description: str) -> Any | None:
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        logging.warning(f"Failed to fetch {description}: {e}")
+        return None
+
+
+def calculate_position_size(
+        exchange,
+        symbol: str,
+        position_size: str | float | int,
+        *,
+        snapshot: ExchangeSnapshot | None = None
+) -> float:
     """
     Calculate position size in base currency.
 
@@ -55,12 +132,16 @@ def calculate_position_size(exchange, symbol: str, position_size: str | float |
         exchange: Exchange client (BitunixFutures or ForwardTester)
         symbol: Trading pair symbol (e.g., "BTCUSDT")
         position_size: Position size specification (percentage string or fixed cost in USDT)
+        snapshot: Preloaded balance (and price, if present); missing values are fetched live
 
     Returns:
         Position size in base currency (e.g., BTC quantity)
     """
-    capital = exchange.get_account_balance("USDT")
-    current_price = exchange.get_current_price(symbol)
+    capital = snapshot.balance if snapshot is not None else exchange.get_account_balance("USDT")
+    if snapshot is not None and snapshot.price is not None:
+        current_price = snapshot.price
+    else:
+        current_price = exchange.get_current_price(symbol)
 
     if isinstance(position_size, str):
         if position_size.endswith("%"):
@@ -95,6 +176,7 @@ def open_position(
         direction: str,
         position_size: str | float | int,
         stop_loss_percent: float | None = None,
+        snapshot: ExchangeSnapshot | None = None,
         **kwargs
 ) -> dict[str, str]:
     """
@@ -114,6 +196,7 @@ def open_position(
         direction: "buy" or "sell"
         position_size: Position size ("10%" or fixed amount like 100)
         stop_loss_percent: Optional stop-loss percentage (e.g., 2.0 for 2%)
+        snapshot: Optional ExchangeSnapshot to size from instead of fetching the balance again
         **kwargs: Additional parameters passed to exchange.place_order()
 
     Returns:
@@ -121,7 +204,7 @@ def open_position(
     """
     side = direction.upper()
 
-    qty = calculate_position_size(exchange, symbol, position_size)
+    qty = calculate_position_size(exchange, symbol, position_size, snapshot=snapshot)
     logging.info(f"Position size: {qty:.6f} {symbol.replace('USDT', '')}")
 
     order_response = exchange.place_order(
@@ -133,7 +216,7 @@ def open_position(
         **kwargs
     )
 
-    if stop_loss_percent is not None and hasattr(exchange, 'place_position_tpsl'):
+    if stop_loss_percent is not None and getattr(exchange, 'SUPPORTS_POSITION_TPSL', False):
         try:
             position = exchange.get_pending_positions(symbol=symbol)
             if position:
@@ -157,20 +240,25 @@ def open_position(
     return order_response
 
 
+_POSITION_SIDES = {
+    "BUY": "buy",
+    "BID": "buy",
+    "LONG": "buy",
+    "SELL": "sell",
+    "ASK": "sell",
+    "SHORT": "sell",
+}
+
+
 def normalize_position_side(raw_side: Optional[str]) -> Optional[str]:
     """Map exchange-specific side labels to 'buy'/'sell' used internally."""
     if not raw_side:
         return None
     side = raw_side.strip().upper()
-    mapping = {
-        "BUY": "buy",
-        "BID": "buy",
-        "LONG": "buy",
-        "SELL": "sell",
-        "ASK": "sell",
-        "SHORT": "sell",
-    }
-    for key, value in mapping.items():
+    normalized = _POSITION_SIDES.get(side)
+    if normalized is not None:
+        return normalized
+    for key, value in _POSITION_SIDES.items():
         if side.startswith(key):
             return value
     logging.warning(f"Unrecognized position side '{raw_side}', treating as None")
@@ -181,43 +269,62 @@ def combine_signals(
         ai_signal: str,
         technical_signal: Optional[str],
         technical_confidence: Optional[float]
-) -> Literal["Bullish", "Bearish", "Neutral"]:
+) -> FusedSignal:
     """
-    Blend AI and deterministic signals.
+    Blend AI and deterministic signals by confidence-weighted voting.
 
-    The AI remains the primary driver, but high-confidence technical checks
-    can break ties or neuter conflicting bets.
+    Each source adds its weight to the score of the label it picked and the
+    highest score wins, ties going to the AI. The AI votes with
+    AI_SIGNAL_CONFIDENCE; the guardrail votes with how far its score sits past
+    its own Bullish/Bearish threshold (or, for Neutral, how far inside it), so a
+    borderline guardrail barely counts. A guardrail opposing a directional AI
+    call can flatten it to Neutral but never flip it.
+
+    Confidence is 1 - (1 - a)(1 - t) when both agree, the winning margin
+    a - t or t - a when they disagree, and AI_SIGNAL_CONFIDENCE alone when no
+    guardrail is available.
     """
     normalized_ai = _normalize_signal(ai_signal)
     normalized_tech = _normalize_signal(technical_signal) if technical_signal else None
 
     if not normalized_tech or technical_confidence is None:
-        return normalized_ai
+        return FusedSignal(signal=normalized_ai, confidence=AI_SIGNAL_CONFIDENCE)
 
-    if normalized_ai == normalized_tech:
-        return normalized_ai
+    tech_weight = _guardrail_weight(normalized_tech, technical_confidence)
 
-    if normalized_ai == "Neutral" and technical_confidence >= 0.55:
-        logging.info(
-            "AI neutral but guardrail %.0f%% confident in %s, following guardrail",
-            technical_confidence * 100,
-            normalized_tech
-        )
-        return normalized_tech
+    if normalized_ai == normalized_tech:
+        consensus = 1 - (1 - AI_SIGNAL_CONFIDENCE) * (1 - tech_weight)
+        logging.info("AI and guardrail agree on %s (combined confidence %.0f%%)", normalized_ai, consensus * 100)
+        return FusedSignal(signal=normalized_ai, confidence=consensus)
 
-    if normalized_tech == "Neutral":
-        return normalized_ai
+    scores = {"Bullish": 0.0, "Bearish": 0.0, "Neutral": 0.0}
+    scores[normalized_ai] += AI_SIGNAL_CONFIDENCE
+    scores[normalized_tech] += tech_weight
+    final = max(scores, key=lambda label: (scores[label], label == normalized_ai))
+    if normalized_ai != "Neutral" and final not in (normalized_ai, "Neutral"):
+        final = "Neutral"
 
-    if technical_confidence >= 0.75:
+    if final != normalized_ai:
         logging.info(
-            "Signal disagreement (AI %s vs technical %s %.0f%%) -> flattening to Neutral",
+            "Signal disagreement (AI %s vs technical %s, vote %.2f vs %.2f) -> %s",
             normalized_ai,
             normalized_tech,
-            technical_confidence * 100
+            AI_SIGNAL_CONFIDENCE,
+            tech_weight,
+            final
         )
-        return "Neutral"
+    return FusedSignal(signal=final, confidence=abs(AI_SIGNAL_CONFIDENCE - tech_weight))
+
 
-    return normalized_ai
+def _guardrail_weight(signal: str, confidence: float) -> float:
+    """Scale the guardrail's distance from its decision threshold to a 0..1 vote."""
+    if signal == "Neutral":
+        span = GUARDRAIL_DIRECTION_CONFIDENCE - GUARDRAIL_NEUTRAL_CONFIDENCE
+        margin = GUARDRAIL_DIRECTION_CONFIDENCE - confidence
+    else:
+        span = GUARDRAIL_MAX_CONFIDENCE - GUARDRAIL_DIRECTION_CONFIDENCE
+        margin = confidence - GUARDRAIL_DIRECTION_CONFIDENCE
+    return max(0.0, min(1.0, margin / span))
 
 
 def _normalize_signal(signal: Optional[str]) -> Literal["Bullish", "Bearish", "Neutral"]:
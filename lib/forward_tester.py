@@ -21,6 +21,8 @@ class ForwardTester:
     Maintains the same public API as BitunixFutures for compatibility.
     """
 
+    SUPPORTS_POSITION_TPSL: bool = False
+
     def __init__(self, config: dict[str, Any]):
         self.initial_capital = config["initial_capital"]
         self.fees = config["fees"]
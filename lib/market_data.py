@@ -1,12 +1,47 @@
-import math
+import atexit
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Literal
 
-import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # optional, only speeds up payload decoding
+    orjson = None
 
 
 BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+MAX_FETCH_WORKERS = 8
+KLINES_CACHE_TTL = 30.0  # seconds
+
+# Shared session so repeated fetches reuse the keep-alive TLS connection to Binance.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_FETCH_WORKERS,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+))
+atexit.register(SESSION.close)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Klines:
+    """Numeric kline columns needed by build_snapshot, oldest bar first."""
+    closes: np.ndarray
+    highs: np.ndarray
+    lows: np.ndarray
+    volumes: np.ndarray
+
+
+_KLINES_CACHE: dict[tuple[str, str, int], tuple[float, Klines]] = {}
 
 
 @dataclass(frozen=True, slots=True)
@@ -32,64 +67,84 @@ class TechnicalSignal:
     rationale: str
 
 
-def fetch_klines(symbol: str, interval: str = "15m", limit: int = 200) -> pd.DataFrame:
+def fetch_klines(
+        symbol: str,
+        interval: str = "15m",
+        limit: int = 200,
+        cache_ttl: float = KLINES_CACHE_TTL
+) -> Klines:
     """
     Fetch recent kline/candlestick data from Binance.
 
     Binance is used here for reliability and speed even if execution happens elsewhere.
+    Responses are reused for `cache_ttl` seconds per (symbol, interval, limit); pass 0 to bypass.
     """
+    key = (symbol, interval, limit)
+    cached = _KLINES_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+        return cached[1]
+
     params = {"symbol": symbol, "interval": interval, "limit": limit}
-    response = requests.get(BINANCE_KLINES_URL, params=params, timeout=10)
+    response = SESSION.get(BINANCE_KLINES_URL, params=params, timeout=10)
     response.raise_for_status()
-    data = response.json()
+    data = orjson.loads(response.content) if orjson is not None else response.json()
 
     if not data:
         raise ValueError(f"No kline data returned for {symbol}")
 
-    df = pd.DataFrame(data, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trade_count",
-        "taker_buy_base", "taker_buy_quote", "ignore"
-    ])
-    numeric_cols = ["open", "high", "low", "close", "volume", "quote_volume", "taker_buy_base", "taker_buy_quote"]
-    df[numeric_cols] = df[numeric_cols].astype(float)
-    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    df["close_time"] = pd.to_datetime(df["close_time"], unit="ms", utc=True)
-    return df
+    klines = Klines(
+        closes=_kline_column(data, 4),
+        highs=_kline_column(data, 2),
+        lows=_kline_column(data, 3),
+        volumes=_kline_column(data, 5),
+    )
+    _KLINES_CACHE[key] = (time.monotonic(), klines)
+    return klines
 
 
-def build_snapshot(symbol: str, interval: str, klines: pd.DataFrame) -> MarketSnapshot:
+def fetch_klines_many(symbols: list[str], interval: str = "15m", limit: int = 200) -> dict[str, Klines]:
+    """
+    Fetch klines for several symbols concurrently.
+
+    Binance serves one symbol per request, so the round-trips are overlapped on a thread pool
+    sharing the module session instead of being issued one after another.
+    """
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(symbols))) as pool:
+        results = pool.map(lambda symbol: fetch_klines(symbol, interval=interval, limit=limit), symbols)
+        return dict(zip(symbols, results))
+
+
+def build_snapshot(symbol: str, interval: str, klines: Klines) -> MarketSnapshot:
     """Compute summary statistics and indicators from candlestick data."""
-    closes = klines["close"]
-    highs = klines["high"]
-    lows = klines["low"]
-    volumes = klines["volume"]
-
-    change_24h = _period_pct_change(closes, bars=int((24 * 60) / _interval_to_minutes(interval)))
-    change_4h = _period_pct_change(closes, bars=int((4 * 60) / _interval_to_minutes(interval)))
-    momentum_1h = _period_pct_change(closes, bars=max(1, int(60 / _interval_to_minutes(interval))))
-    rsi = _calculate_rsi(closes, period=14)
-    sma_fast = _safe_value(closes.rolling(window=20).mean().iloc[-1], closes.iloc[-1])
-    sma_slow = _safe_value(closes.rolling(window=60).mean().iloc[-1], closes.iloc[-1])
-    atr_value = _calculate_atr(highs, lows, closes, period=14)
-    atr_pct = (atr_value / closes.iloc[-1] * 100) if closes.iloc[-1] else 0.0
-    volatility_24h = closes.pct_change().rolling(window=int((24 * 60) / _interval_to_minutes(interval))).std().iloc[-1]
-    volatility_24h = _safe_value(volatility_24h, 0.0)
-    volume_24h = volumes.iloc[-int((24 * 60) / _interval_to_minutes(interval)):].sum()
+    closes = klines.closes
+    highs = klines.highs
+    lows = klines.lows
+    volumes = klines.volumes
+    latest_close = float(closes[-1])
+
+    minutes = _interval_to_minutes(interval)
+    bars_24h = (24 * 60) // minutes
+    bars_4h = (4 * 60) // minutes
+    bars_1h = max(1, 60 // minutes)
+
+    returns = np.diff(closes) / closes[:-1]
+    volatility_24h = returns[-bars_24h:].std(ddof=1) if 1 < bars_24h <= len(returns) else 0.0
 
     snapshot = MarketSnapshot(
         symbol=symbol,
         interval=interval,
-        latest_close=closes.iloc[-1],
-        change_24h=change_24h,
-        change_4h=change_4h,
-        momentum_1h=momentum_1h,
-        rsi=rsi,
-        sma_fast=sma_fast,
-        sma_slow=sma_slow,
-        atr_pct=atr_pct,
-        volume_24h=volume_24h,
-        volatility_24h=volatility_24h,
+        latest_close=latest_close,
+        change_24h=_period_pct_change(closes, bars=bars_24h),
+        change_4h=_period_pct_change(closes, bars=bars_4h),
+        momentum_1h=_period_pct_change(closes, bars=bars_1h),
+        rsi=_calculate_rsi(closes, period=14),
+        sma_fast=_tail_mean(closes, window=20, fallback=latest_close),
+        sma_slow=_tail_mean(closes, window=60, fallback=latest_close),
+        atr_pct=(_calculate_atr(highs, lows, closes, period=14) / latest_close * 100) if latest_close else 0.0,
+        volume_24h=float(volumes[-bars_24h:].sum()),
+        volatility_24h=_safe_value(volatility_24h, 0.0),
     )
     return snapshot
 
@@ -100,39 +155,20 @@ def derive_signal(snapshot: MarketSnapshot) -> TechnicalSignal:
 
     The goal is not to be perfect but to provide a sanity check for the LLM.
     """
-    score = 0.0
-    rationale_parts: list[str] = []
+    latest_close, sma_fast, sma_slow = snapshot.latest_close, snapshot.sma_fast, snapshot.sma_slow
+    rsi, momentum_1h, change_24h = snapshot.rsi, snapshot.momentum_1h, snapshot.change_24h
 
-    trend_bias = 0.25 if snapshot.latest_close > snapshot.sma_slow else -0.25
-    score += trend_bias
-    rationale_parts.append(
-        f"Price {'above' if trend_bias > 0 else 'below'} long SMA ({snapshot.latest_close:.0f} vs {snapshot.sma_slow:.0f})"
-    )
+    above_slow = latest_close > sma_slow
+    fast_above_slow = sma_fast > sma_slow
+    rsi_strong = rsi >= 55
+    rsi_weak = not rsi_strong and rsi <= 45
 
-    ma_cross_bias = 0.2 if snapshot.sma_fast > snapshot.sma_slow else -0.2
-    score += ma_cross_bias
-    rationale_parts.append("SMA20" + (">" if ma_cross_bias > 0 else "<") + "SMA60")
-
-    if snapshot.rsi >= 55:
-        rsi_bias = min(0.2, (snapshot.rsi - 55) / 100)
-        score += rsi_bias
-        rationale_parts.append(f"RSI strong ({snapshot.rsi:.1f})")
-    elif snapshot.rsi <= 45:
-        rsi_bias = -min(0.2, (45 - snapshot.rsi) / 100)
-        score += rsi_bias
-        rationale_parts.append(f"RSI weak ({snapshot.rsi:.1f})")
-
-    if snapshot.momentum_1h >= 0.002:
-        score += 0.15
-        rationale_parts.append(f"1h momentum +{snapshot.momentum_1h * 100:.2f}%")
-    elif snapshot.momentum_1h <= -0.002:
-        score -= 0.15
-        rationale_parts.append(f"1h momentum {snapshot.momentum_1h * 100:.2f}%")
-
-    if snapshot.change_24h >= 0.005:
-        score += 0.1
-    elif snapshot.change_24h <= -0.005:
-        score -= 0.1
+    trend_bias = 0.25 if above_slow else -0.25
+    ma_cross_bias = 0.2 if fast_above_slow else -0.2
+    rsi_bias = min(0.2, (rsi - 55) / 100) if rsi_strong else -min(0.2, (45 - rsi) / 100) if rsi_weak else 0.0
+    momentum_bias = 0.15 if momentum_1h >= 0.002 else -0.15 if momentum_1h <= -0.002 else 0.0
+    change_bias = 0.1 if change_24h >= 0.005 else -0.1 if change_24h <= -0.005 else 0.0
+    score = trend_bias + ma_cross_bias + rsi_bias + momentum_bias + change_bias
 
     signal: Literal["Bullish", "Bearish", "Neutral"]
     if score > 0.15:
@@ -143,6 +179,14 @@ def derive_signal(snapshot: MarketSnapshot) -> TechnicalSignal:
         signal = "Neutral"
 
     confidence = max(0.45, min(0.95, 0.55 + abs(score)))
+    rationale_parts = [
+        f"Price {'above' if above_slow else 'below'} long SMA ({latest_close:.0f} vs {sma_slow:.0f})",
+        f"SMA20{'>' if fast_above_slow else '<'}SMA60",
+    ]
+    if rsi_strong or rsi_weak:
+        rationale_parts.append(f"RSI {'strong' if rsi_strong else 'weak'} ({rsi:.1f})")
+    if momentum_bias:
+        rationale_parts.append(f"1h momentum {momentum_1h * 100:+.2f}%")
     rationale = "; ".join(rationale_parts)
 
     return TechnicalSignal(signal=signal, confidence=confidence, rationale=rationale)
@@ -163,16 +207,27 @@ def format_market_context(snapshot: MarketSnapshot, signal: TechnicalSignal) ->
     return context
 
 
-def _period_pct_change(series: pd.Series, bars: int) -> float:
-    if len(series) <= bars or bars <= 0:
-        return 0.0
-    latest = series.iloc[-1]
-    base = series.iloc[-bars - 1]
-    if base == 0:
+def _kline_column(rows: list[list], index: int) -> np.ndarray:
+    # Binance sends prices and volumes as strings; fill a preallocated float buffer directly.
+    column = np.fromiter((float(row[index]) for row in rows), dtype=np.float64, count=len(rows))
+    column.flags.writeable = False  # shared through the kline cache
+    return column
+
+
+def _period_pct_change(closes: np.ndarray, bars: int) -> float:
+    if bars <= 0 or len(closes) <= bars:
         return 0.0
-    return (latest - base) / base
+    base = closes[-bars - 1]
+    return float((closes[-1] - base) / base) if base else 0.0
+
+
+def _tail_mean(values: np.ndarray, window: int, fallback: float) -> float:
+    if len(values) < window:
+        return fallback
+    return _safe_value(values[-window:].mean(), fallback)
 
 
+@lru_cache(maxsize=32)
 def _interval_to_minutes(interval: str) -> int:
     unit = interval[-1]
     value = int(interval[:-1])
@@ -182,38 +237,73 @@ def _interval_to_minutes(interval: str) -> int:
     return value * multipliers[unit]
 
 
-def _calculate_rsi(series: pd.Series, period: int) -> float:
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss.replace(0, pd.NA)
-    rsi = 100 - (100 / (1 + rs))
-    value = rsi.iloc[-1]
-    return _safe_value(value, 50.0)
-
-
-def _calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int) -> float:
-    prev_close = close.shift(1)
-    tr = pd.concat([
-        (high - low),
-        (high - prev_close).abs(),
-        (low - prev_close).abs()
-    ], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    value = atr.iloc[-1]
-    return _safe_value(value, 0.0)
-
-
-def _safe_value(value: float, fallback: float) -> float:
-    if value is None:
-        return fallback
+def _calculate_rsi(closes: np.ndarray, period: int) -> float:
+    """RSI of the latest bar using Wilder's smoothing."""
+    rsi_kernel, _ = _indicator_kernels()
+    return _safe_value(rsi_kernel(closes, period), 50.0)
+
+
+def _calculate_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> float:
+    _, atr_kernel = _indicator_kernels()
+    return _safe_value(atr_kernel(high, low, close, period), 0.0)
+
+
+@lru_cache(maxsize=1)
+def _indicator_kernels():
+    """
+    Pick the RSI/ATR kernels on first use, after the caller has loaded its .env.
+
+    MARKET_DATA_JIT=1 compiles them with Numba. It is opt-in because importing numba
+    costs more than these loops save on a once-a-day run; without numba installed the
+    flag is ignored with a warning and the plain Python loops are used.
+    """
+    if os.environ.get("MARKET_DATA_JIT") != "1":
+        return _rsi_last, _atr_last
     try:
-        if pd.isna(value):
-            return fallback
-    except Exception:
-        pass
-    if isinstance(value, float) and math.isnan(value):
+        from numba import njit
+    except ImportError:
+        logging.warning("MARKET_DATA_JIT=1 but numba is not installed, using Python indicator loops")
+        return _rsi_last, _atr_last
+    return njit(cache=True)(_rsi_last), njit(cache=True)(_atr_last)
+
+
+def _rsi_last(closes: np.ndarray, period: int) -> float:
+    n = closes.shape[0]
+    if n - 1 < period:
+        return 50.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = closes[i] - closes[i - 1]
+        if d > 0:
+            avg_gain += d
+        else:
+            avg_loss -= d
+    avg_gain /= period
+    avg_loss /= period
+    for i in range(period + 1, n):
+        d = closes[i] - closes[i - 1]
+        avg_gain = (avg_gain * (period - 1) + (d if d > 0 else 0.0)) / period
+        avg_loss = (avg_loss * (period - 1) + (-d if d < 0 else 0.0)) / period
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def _atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> float:
+    n = close.shape[0]
+    if n <= period:
+        return 0.0
+    # Only the true ranges inside the final window contribute to the latest ATR.
+    total = 0.0
+    for i in range(n - period, n):
+        prev_close = close[i - 1]
+        total += max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+    return total / period
+
+
+def _safe_value(value: float | None, fallback: float) -> float:
+    # NaN is the only value not equal to itself, for both Python floats and NumPy scalars.
+    if value is None or value != value:
         return fallback
     return float(value)